@@ -1,8 +1,12 @@
+# Formato dei dataset processati: "parquet" (colonnare, dtype preservati) oppure "csv".
+# Altri valori vengono rifiutati con ValueError in scrittura e in lettura.
+OUTPUT_FORMAT = "parquet"
+
 # Percorsi dei file
 RAW_DATA_PATH = "../data/raw/stroke-data.csv"
-TRAIN_DATA_PATH = "../data/processed/train.csv"
-VALIDATION_DATA_PATH = "../data/processed/validation.csv"
-TEST_DATA_PATH = "../data/processed/test.csv"
+TRAIN_DATA_PATH = f"../data/processed/train.{OUTPUT_FORMAT}"
+VALIDATION_DATA_PATH = f"../data/processed/validation.{OUTPUT_FORMAT}"
+TEST_DATA_PATH = f"../data/processed/test.{OUTPUT_FORMAT}"
 MODEL_PATH = "../model/rf_model.joblib"
 THRESHOLD_OPTIMAL_PATH = "../model/optimal_threshold.txt"
 EDA_REPORT_PATH = "../data/eda/eda_report.txt"
@@ -9,18 +9,21 @@
 #   2) Creazione di train/val/test (70/15/15) con stratificazione su stroke
 #   3) Preprocessing calcolato sul training set (imputazione, encoding, ecc.)
 #   4) Applicazione delle stesse trasformazioni su validation/test
-#   5) Salvataggio dei CSV finali (train, validation, test)
+#   5) Salvataggio dei dataset finali (train, validation, test) in Parquet o CSV
 #
 #   NB: Nessun oversampling/undersampling viene applicato (non verranno creati più dati artificiali in seguito ai tentativi precedenti).
 #   Le trasformazioni (mediana, encoding) sono calcolate sul train set e poi applicate a val/test.
 
 import os
 import sys
+import json
+import math
+from fractions import Fraction
 import pandas as pd
 import numpy as np
 import logging
 import joblib  # Import per salvare gli encoder
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.preprocessing import LabelEncoder
 from scripts import config  # Import delle variabili di configurazione
 
@@ -30,79 +33,193 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)]
 )
 
+# Feature non utilizzate dal modello: non vengono nemmeno caricate dal CSV grezzo
+FEATURES_TO_REMOVE = ["id", "gender", "Residence_type"]
+
+# Colonne testuali caricate, lette direttamente come category (dictionary-encoded)
+CATEGORICAL_COLUMNS = ["ever_married", "work_type", "smoking_status"]
+
+def load_raw_data(path):
+    """
+    Carica il dataset grezzo leggendo solo le colonne utilizzate (usecols), con il
+    parser Arrow multi-thread e le colonne testuali come category. Le colonne
+    numeriche restano in dtype NumPy per sklearn/numpy a valle.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in header if c not in FEATURES_TO_REMOVE]
+    return pd.read_csv(path, engine="pyarrow", usecols=usecols,
+                       dtype={c: "category" for c in CATEGORICAL_COLUMNS})
+
+def as_str_values(series):
+    """
+    Restituisce i valori di series come array di stringhe NumPy (valori mancanti -> "nan").
+    A differenza di Series.astype(str), il risultato non dipende dalla versione di pandas.
+    """
+    return series.astype(object).to_numpy().astype(str)
+
 def create_label_encoder(train_series):
     """Crea e addestra un LabelEncoder su train_series."""
     le = LabelEncoder()
-    le.fit(train_series.astype(str))
+    le.fit(as_str_values(train_series))
     return le
 
-def apply_label_encoding(df_train, df_val, df_test, column, encoders_dict):
+def apply_label_encoding(df_train, df_val, df_test, columns, encoders_dict):
+    """
+    Crea un LabelEncoder per ciascuna colonna di df_train in columns, applica
+    l'encoding a train/val/test e salva gli encoder in encoders_dict per uso futuro.
+    Le categorie non viste nel train vengono codificate come -1; i codici sono int8.
+    """
+    train_dtypes = {}
+    for column in columns:
+        le = create_label_encoder(df_train[column])
+        encoders_dict[column] = le  # Salva l'encoder
+        # Le classi del LabelEncoder sono ordinate: ricodificando la colonna sulle sue classi,
+        # i codici coincidono con quelli di le.transform (valori assenti dal train -> -1).
+        train_dtypes[column] = pd.CategoricalDtype(le.classes_)
+
+    # Un'unica conversione per DataFrame su tutte le colonne categoriali, a partire dagli
+    # stessi valori (as_str_values) su cui sono stati addestrati gli encoder
+    for df_ in [df_train, df_val, df_test]:
+        encoded = pd.DataFrame({c: as_str_values(df_[c]) for c in columns}).astype(train_dtypes)
+        for column in columns:
+            df_[column] = encoded[column].cat.codes.to_numpy(dtype=np.int8)
+
+def fill_nan(series, value):
+    """Restituisce i valori di series come array float64 con i NaN sostituiti da value."""
+    arr = series.to_numpy(dtype=np.float64, copy=True)
+    np.copyto(arr, value, where=np.isnan(arr))
+    return arr
+
+def binarize_yes(series):
+    """
+    Converte una colonna binaria "Yes"/"No" in 1/0 (int8) con un confronto vettoriale.
+    Solleva ValueError se la colonna contiene valori diversi da "Yes"/"No" (NaN inclusi),
+    che altrimenti verrebbero codificati silenziosamente come 0.
+    """
+    values = series.to_numpy(dtype=object)
+    unexpected = ~np.isin(values, ["Yes", "No"])
+    if unexpected.any():
+        raise ValueError(f"Valori inattesi in '{series.name}': {sorted(set(map(str, values[unexpected])))}")
+    return (values == "Yes").astype(np.int8)
+
+def split_sizes(n_samples, train_size=0.70, val_size=0.15):
+    """
+    Calcola il numero di righe (holdout, test) per uno split train/val/test.
+    Le proporzioni vengono convertite in frazioni esatte (0.70 -> 7/10), così il
+    risultato non dipende da errori floating point (1.0 - 0.70 = 0.30000000000000004).
+    Come sklearn per test_size, si arrotonda per eccesso: n_holdout = ceil(0.30 * n),
+    n_test = ceil(0.5 * n_holdout).
+    """
+    holdout_share = 1 - Fraction(train_size).limit_denominator(1000)
+    test_share = (holdout_share - Fraction(val_size).limit_denominator(1000)) / holdout_share
+    n_holdout = math.ceil(holdout_share * n_samples)
+    n_test = math.ceil(test_share * n_holdout)
+    return n_holdout, n_test
+
+def stratified_split_indices(y, train_size=0.70, val_size=0.15, random_state=None):
     """
-    Crea un LabelEncoder per df_train[column], lo applica a train/val/test
-    e lo salva in encoders_dict per uso futuro.
+    Restituisce gli indici posizionali (train, val, test) di uno split stratificato su y.
+    Gli split vengono calcolati con StratifiedShuffleSplit sui soli indici, con numero di
+    righe intero (split_sizes), evitando di materializzare DataFrame intermedi.
     """
-    le = create_label_encoder(df_train[column])
-    df_train[column] = le.transform(df_train[column].astype(str))
+    y_values = np.asarray(y)
+    n_holdout, n_test = split_sizes(len(y_values), train_size, val_size)
 
-    for df_ in [df_val, df_test]:
-        df_[column] = df_[column].apply(lambda x: x if x in le.classes_ else None)
-        df_[column] = df_[column].astype("object").replace({None: "UNK"})
-        if "UNK" not in le.classes_:
-            le.classes_ = np.array(list(le.classes_) + ["UNK"], dtype=object)
-        df_[column] = df_[column].map(lambda x: -1 if x == "UNK" else le.transform([x])[0])
+    sss_train = StratifiedShuffleSplit(n_splits=1, test_size=n_holdout, random_state=random_state)
+    train_idx, holdout_idx = next(sss_train.split(np.zeros(len(y_values)), y_values))
 
-    encoders_dict[column] = le  # Salva l'encoder
+    sss_holdout = StratifiedShuffleSplit(n_splits=1, test_size=n_test, random_state=random_state)
+    val_pos, test_pos = next(sss_holdout.split(np.zeros(len(holdout_idx)), y_values[holdout_idx]))
+    return train_idx, holdout_idx[val_pos], holdout_idx[test_pos]
 
-def main():
-    df = pd.read_csv(config.RAW_DATA_PATH)
-    logging.info(f"[PRE-PROCESSING] Dataset caricato: {df.shape}")
+def apply_numeric_transforms(df, median_bmi):
+    """
+    Applica in un'unica chiamata per split le trasformazioni vettoriali che non
+    dipendono dagli encoder: imputazione di 'bmi' con la mediana del train e
+    binarizzazione di 'ever_married'. Se median_bmi è None l'imputazione viene saltata.
+    """
+    if median_bmi is not None and "bmi" in df.columns:
+        df["bmi"] = fill_nan(df["bmi"], median_bmi)
+    if "ever_married" in df.columns:
+        df["ever_married"] = binarize_yes(df["ever_married"])
+
+def downcast_dtypes(df):
+    """
+    Riduce i dtype delle colonne del dataset processato: int8 per i flag e il target,
+    float32 per le feature continue (bmi, avg_glucose_level). ever_married e i codici
+    categoriali sono già int8 (binarize_yes, apply_label_encoding).
+    """
+    int8_cols = ["hypertension", "heart_disease", config.TARGET_COLUMN]
+    float32_cols = ["bmi", "avg_glucose_level"]
+    dtypes = {c: np.int8 for c in int8_cols if c in df.columns}
+    dtypes.update({c: np.float32 for c in float32_cols if c in df.columns})
+    return df.astype(dtypes)
+
+def save_dataset(df, path):
+    """Salva df nel formato definito da config.OUTPUT_FORMAT ("parquet" o "csv")."""
+    if config.OUTPUT_FORMAT == "parquet":
+        df.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+    elif config.OUTPUT_FORMAT == "csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"OUTPUT_FORMAT non supportato: {config.OUTPUT_FORMAT!r} (ammessi: 'parquet', 'csv')")
+
+def save_model_arrays(df, path):
+    """
+    Salva accanto al dataset le matrici pronte per il modello: X (float32, column-major,
+    cioè contigua per feature) in <nome>.X.npy e il target (int8) in <nome>.y.npy.
+    L'ordine delle colonne di X (quello del DataFrame senza il target) viene salvato
+    in <nome>.columns.json, in modo che i .npy restino interpretabili.
+    """
+    base_path = os.path.splitext(path)[0]
+    X_df = df.drop(columns=[config.TARGET_COLUMN])
+    feature_names = X_df.columns.tolist()
+    np.save(f"{base_path}.X.npy", np.asfortranarray(X_df.to_numpy(dtype=np.float32)))
+    np.save(f"{base_path}.y.npy", df[config.TARGET_COLUMN].to_numpy(dtype=np.int8))
+    with open(f"{base_path}.columns.json", "w") as f:
+        json.dump(feature_names, f)
+    return feature_names
 
-    X_full = df.drop(columns=[config.TARGET_COLUMN])
-    y_full = df[config.TARGET_COLUMN]
+def main():
+    df = load_raw_data(config.RAW_DATA_PATH)
+    logging.info(f"[PRE-PROCESSING] Dataset caricato: {df.shape} (escluse {FEATURES_TO_REMOVE})")
 
-    X_train, X_temp, y_train, y_temp = train_test_split(
-        X_full, y_full, test_size=0.30, random_state=config.RANDOM_STATE, stratify=y_full
+    train_idx, val_idx, test_idx = stratified_split_indices(
+        df[config.TARGET_COLUMN], train_size=0.70, val_size=0.15, random_state=config.RANDOM_STATE
     )
-    X_val, X_test, y_val, y_test = train_test_split(
-        X_temp, y_temp, test_size=0.5, random_state=config.RANDOM_STATE, stratify=y_temp
-    )
-
-    features_to_remove = ["id", "gender", "Residence_type"]
-    X_train = X_train.drop(columns=features_to_remove, errors='ignore')
-    X_val = X_val.drop(columns=features_to_remove, errors='ignore')
-    X_test = X_test.drop(columns=features_to_remove, errors='ignore')
 
-    df_train = pd.concat([X_train, y_train], axis=1).reset_index(drop=True)
-    df_val   = pd.concat([X_val, y_val], axis=1).reset_index(drop=True)
-    df_test  = pd.concat([X_test, y_test], axis=1).reset_index(drop=True)
+    df_train = df.iloc[train_idx].reset_index(drop=True)
+    df_val   = df.iloc[val_idx].reset_index(drop=True)
+    df_test  = df.iloc[test_idx].reset_index(drop=True)
 
-    logging.info(f"[PRE-PROCESSING] Train: {X_train.shape[0]} | Val: {X_val.shape[0]} | Test: {X_test.shape[0]}")
+    logging.info(f"[PRE-PROCESSING] Train: {df_train.shape[0]} | Val: {df_val.shape[0]} | Test: {df_test.shape[0]}")
 
+    median_bmi = None
     if "bmi" in df_train.columns:
-        median_bmi = df_train["bmi"].median()
-        df_train["bmi"] = df_train["bmi"].fillna(median_bmi)
-        df_val["bmi"] = df_val["bmi"].fillna(median_bmi)
-        df_test["bmi"] = df_test["bmi"].fillna(median_bmi)
-        logging.info("[PRE-PROCESSING] Imputazione per 'bmi' completata.")
+        median_bmi = np.nanmedian(df_train["bmi"].to_numpy(dtype=np.float64))
+    for df_ in [df_train, df_val, df_test]:
+        apply_numeric_transforms(df_, median_bmi)
+    logging.info("[PRE-PROCESSING] Imputazione 'bmi' e binarizzazione 'ever_married' completate.")
 
     encoders = {}
-    cat_multi = ["work_type", "smoking_status"]
-    for c in cat_multi:
-        if c in df_train.columns:
-            apply_label_encoding(df_train, df_val, df_test, c, encoders)
-            logging.info(f"[PRE-PROCESSING] Encoding per '{c}' completato.")
-
-    if "ever_married" in df_train.columns:
-        bin_map = {"No": 0, "Yes": 1}
-        df_train["ever_married"] = df_train["ever_married"].map(bin_map)
-        df_val["ever_married"]   = df_val["ever_married"].map(bin_map)
-        df_test["ever_married"]  = df_test["ever_married"].map(bin_map)
-        logging.info("[PRE-PROCESSING] Binarizzazione per 'ever_married' completata.")
+    cat_multi = [c for c in ["work_type", "smoking_status"] if c in df_train.columns]
+    if cat_multi:
+        apply_label_encoding(df_train, df_val, df_test, cat_multi, encoders)
+        logging.info(f"[PRE-PROCESSING] Encoding per {cat_multi} completato.")
+
+    df_train = downcast_dtypes(df_train)
+    df_val   = downcast_dtypes(df_val)
+    df_test  = downcast_dtypes(df_test)
 
     os.makedirs(os.path.dirname(config.TRAIN_DATA_PATH), exist_ok=True)
-    df_train.to_csv(config.TRAIN_DATA_PATH, index=False)
-    df_val.to_csv(config.VALIDATION_DATA_PATH, index=False)
-    df_test.to_csv(config.TEST_DATA_PATH, index=False)
+    save_dataset(df_train, config.TRAIN_DATA_PATH)
+    save_dataset(df_val, config.VALIDATION_DATA_PATH)
+    save_dataset(df_test, config.TEST_DATA_PATH)
+
+    feature_names = save_model_arrays(df_train, config.TRAIN_DATA_PATH)
+    save_model_arrays(df_val, config.VALIDATION_DATA_PATH)
+    save_model_arrays(df_test, config.TEST_DATA_PATH)
+    logging.info(f"[PRE-PROCESSING] Matrici X/y (column-major) salvate in formato .npy. Colonne di X: {feature_names}")
 
     joblib.dump(encoders, os.path.join(os.path.dirname(config.ENCODER_PATH), "label_encoders.joblib"))
     logging.info(f"[PRE-PROCESSING] Label Encoders salvati con successo in \"{config.ENCODER_PATH}\"")
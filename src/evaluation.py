@@ -25,6 +25,14 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)]
 )
 
+def load_dataset(path):
+    """Carica un dataset processato nel formato definito da config.OUTPUT_FORMAT ("parquet" o "csv")."""
+    if config.OUTPUT_FORMAT == "parquet":
+        return pd.read_parquet(path, engine="pyarrow")
+    if config.OUTPUT_FORMAT == "csv":
+        return pd.read_csv(path)
+    raise ValueError(f"OUTPUT_FORMAT non supportato: {config.OUTPUT_FORMAT!r} (ammessi: 'parquet', 'csv')")
+
 def plot_confusion_matrix(cm, classes, title="Matrice di Confusione", cmap=None, save_path=None):
     # Plotta la matrice di confusione.
     if cmap is None:
@@ -113,7 +121,7 @@ def main():
 
         if not os.path.exists(config.TEST_DATA_PATH):
             raise FileNotFoundError(f"[EVALUATION] Test set non trovato: {config.TEST_DATA_PATH}")
-        df_test = pd.read_csv(config.TEST_DATA_PATH)
+        df_test = load_dataset(config.TEST_DATA_PATH)
         logging.info(f"[EVALUATION] Test set caricato: {df_test.shape[0]} righe, {df_test.shape[1]} colonne.")
 
         # Separiamo feature e target
@@ -1,6 +1,6 @@
 # model.py
 # Script per l'addestramento di un modello Random Forest finalizzato alla predizione dell'ictus.
-# - Carica train.csv (non oversamplato) e validation.csv da data/processed/.
+# - Carica train e validation (non oversamplati, in Parquet o CSV) da data/processed/.
 # - Esegue la Cross-Validation sul training set usando RandomizedSearchCV.
 # - Ottimizza una soglia di classificazione sul validation set tramite la Precision-Recall Curve,
 #   utilizzando il F2-score come metrica primaria.
@@ -25,6 +25,14 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)]
 )
 
+def load_dataset(path):
+    """Carica un dataset processato nel formato definito da config.OUTPUT_FORMAT ("parquet" o "csv")."""
+    if config.OUTPUT_FORMAT == "parquet":
+        return pd.read_parquet(path, engine="pyarrow")
+    if config.OUTPUT_FORMAT == "csv":
+        return pd.read_csv(path)
+    raise ValueError(f"OUTPUT_FORMAT non supportato: {config.OUTPUT_FORMAT!r} (ammessi: 'parquet', 'csv')")
+
 def compute_cv_metrics(model, X, y, cv_splits=5):
     """
     Esegue una Stratified K-Fold cross-validation e calcola precision, recall, F2 e ROC-AUC per ogni fold.
@@ -88,8 +96,8 @@ def main():
         if not os.path.exists(val_path):
             raise FileNotFoundError(f"Validation file non trovato: {val_path}")
 
-        df_train = pd.read_csv(train_path)
-        df_val   = pd.read_csv(val_path)
+        df_train = load_dataset(train_path)
+        df_val   = load_dataset(val_path)
 
         logging.info(f"[MODEL] Train set caricato: {df_train.shape[0]} righe, {df_train.shape[1]} colonne.")
         logging.info(f"[MODEL] Validation set caricato: {df_val.shape[0]} righe, {df_val.shape[1]} colonne.")